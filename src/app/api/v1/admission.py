@@ -0,0 +1,244 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from typing import Optional
+
+import structlog
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = structlog.get_logger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Per-user and global concurrency limiter with a bounded wait queue.
+
+    A request is admitted when both the global and its user's in-flight
+    counts are below their limits. Otherwise it waits in the queue until a
+    slot frees up or ``queue_timeout`` expires. When the queue (or the
+    user's share of it) is full the request is rejected immediately.
+
+    Waiters are admitted in arrival order: a freed slot goes to the oldest
+    waiter that fits, and new arrivals queue behind it. Waiters held back by
+    their own user's limit do not block other users.
+    """
+
+    def __init__(
+        self,
+        global_limit: int,
+        per_user_limit: int,
+        queue_size: int,
+        per_user_queue_size: int,
+        queue_timeout: float,
+    ):
+        self.global_limit = global_limit
+        self.per_user_limit = per_user_limit
+        self.queue_size = queue_size
+        self.per_user_queue_size = per_user_queue_size
+        self.queue_timeout = queue_timeout
+
+        self._condition = asyncio.Condition()
+        self._in_flight = 0
+        self._queued = 0
+        self._in_flight_by_user: dict[str, int] = defaultdict(int)
+        self._queued_by_user: dict[str, int] = defaultdict(int)
+        self._waiters: deque[list[str]] = deque()
+        self._rejected = {
+            "user_queue_full": 0,
+            "queue_full": 0,
+            "user_timeout": 0,
+            "timeout": 0,
+        }
+
+    def _can_admit(self, user_key: str) -> bool:
+        return (
+            self._in_flight < self.global_limit
+            and self._in_flight_by_user.get(user_key, 0) < self.per_user_limit
+        )
+
+    def _first_admissible(self) -> Optional[list[str]]:
+        for waiter in self._waiters:
+            if self._can_admit(waiter[0]):
+                return waiter
+        return None
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self._rejected[reason] += 1
+        return AdmissionRejected(status_code, reason)
+
+    async def acquire(self, user_key: str):
+        async with self._condition:
+            if not self._can_admit(user_key) or self._first_admissible() is not None:
+                if self._queued_by_user.get(user_key, 0) >= self.per_user_queue_size:
+                    raise self._reject(429, "user_queue_full")
+                if self._queued >= self.queue_size:
+                    raise self._reject(503, "queue_full")
+
+                # A list, so that every waiter is a distinct deque entry
+                waiter = [user_key]
+                self._waiters.append(waiter)
+                self._queued += 1
+                self._queued_by_user[user_key] += 1
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(
+                            lambda: self._first_admissible() is waiter
+                        ),
+                        timeout=self.queue_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    if self._in_flight < self.global_limit:
+                        # Only the user's own requests were in the way
+                        raise self._reject(429, "user_timeout")
+                    raise self._reject(503, "timeout")
+                finally:
+                    self._waiters.remove(waiter)
+                    self._queued -= 1
+                    self._queued_by_user[user_key] -= 1
+                    if not self._queued_by_user[user_key]:
+                        del self._queued_by_user[user_key]
+                    # The next waiter may now be first, or fit a remaining slot
+                    self._condition.notify_all()
+
+            self._in_flight += 1
+            self._in_flight_by_user[user_key] += 1
+
+    async def release(self, user_key: str):
+        async with self._condition:
+            self._in_flight -= 1
+            self._in_flight_by_user[user_key] -= 1
+            if not self._in_flight_by_user[user_key]:
+                del self._in_flight_by_user[user_key]
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "active_users": len(self._in_flight_by_user),
+            "queued_users": len(self._queued_by_user),
+            "rejected": dict(self._rejected),
+            "limits": {
+                "global": self.global_limit,
+                "per_user": self.per_user_limit,
+                "queue_size": self.queue_size,
+                "per_user_queue_size": self.per_user_queue_size,
+                "queue_timeout": self.queue_timeout,
+            },
+        }
+
+
+def _user_key(scope: Scope) -> str:
+    """
+    Identify the caller from the session token, falling back to the client IP.
+
+    Only the token prefix is used, so no database lookup happens before the
+    request is admitted.
+    """
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+
+    session_token: Optional[str] = None
+    for cookie in headers.get("cookie", "").split(";"):
+        name, _, value = cookie.strip().partition("=")
+        if name == "better-auth.session_token" and value:
+            session_token = value
+            break
+    if not session_token:
+        auth_header = headers.get("authorization", "")
+        if auth_header.startswith("Bearer "):
+            session_token = auth_header.split(" ")[1]
+
+    if session_token:
+        return f"token:{session_token.split('.')[0]}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying an ``AdmissionController`` to selected paths.
+
+    The slot is held until the last chunk of the response body has been sent,
+    so streaming CopilotKit responses count as in flight while they stream,
+    while background tasks running after the response do not.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        path_prefixes: tuple[str, ...],
+        retry_after: int,
+    ):
+        self.app = app
+        self.controller = controller
+        self.path_prefixes = path_prefixes
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        user_key = _user_key(scope)
+        try:
+            await self.controller.acquire(user_key)
+        except AdmissionRejected as e:
+            logger.warning(
+                "Request rejected by admission control",
+                path=scope["path"],
+                reason=e.reason,
+                status_code=e.status_code,
+            )
+            await self._send_rejection(send, e)
+            return
+
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                await self.controller.release(user_key)
+
+        async def send_and_release(message: Message):
+            await send(message)
+            # Background tasks run after the last body chunk, within this same
+            # call; they must not hold the slot
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                await release()
+
+        try:
+            await self.app(scope, receive, send_and_release)
+        finally:
+            await release()
+
+    async def _send_rejection(self, send: Send, rejection: AdmissionRejected):
+        body = json.dumps(
+            {"detail": "Server is busy, retry later", "reason": rejection.reason}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": rejection.status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime
 import structlog
 from fastapi import Depends, HTTPException, Request, status
@@ -7,6 +8,7 @@ from app.core import settings
 from app.db.base import engine
 
 from app.db.models import SessionModel
+from app.utils.profiling import span
 
 logger = structlog.get_logger(__name__)
 
@@ -41,7 +43,8 @@ async def verify_session_token(
         )
     statement = select(SessionModel).where(SessionModel.token == token)
     try:
-        session_from_db = session.exec(statement).one()
+        with span("auth_lookup"):
+            session_from_db = session.exec(statement).one()
     except (NoResultFound, MultipleResultsFound) as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid session {e}"
@@ -54,3 +57,17 @@ async def verify_session_token(
         )
 
     return session_from_db
+
+
+async def verify_admin_key(request: Request):
+    admin_key = request.headers.get("X-Admin-Key")
+    if not settings.admin_api_key or not admin_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Admin key missing",
+        )
+    if not secrets.compare_digest(admin_key, settings.admin_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key",
+        )
@@ -0,0 +1,81 @@
+import random
+import secrets
+
+import structlog
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import settings
+from app.utils.profiling import profile_request
+
+logger = structlog.get_logger(__name__)
+
+
+def _profiling_reason(scope: Scope, sample_rate: float):
+    """
+    Decide whether a request is profiled.
+
+    A request is profiled when it sends ``X-Profile: 1`` together with a valid
+    ``X-Admin-Key``, or when it is picked by the sampling rate.
+    """
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+    if headers.get("x-profile", "").lower() in ("1", "true"):
+        admin_key = headers.get("x-admin-key", "")
+        if settings.admin_api_key and secrets.compare_digest(
+            admin_key, settings.admin_api_key
+        ):
+            return "header"
+    if sample_rate > 0 and random.random() < sample_rate:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected requests on demand.
+
+    Profiled responses carry an ``X-Profile-Id`` header; the profile can then
+    be fetched from ``/admin/profiles/{profile_id}``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefixes: tuple[str, ...],
+        sample_rate: float,
+    ):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(
+            self.path_prefixes
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        reason = _profiling_reason(scope, self.sample_rate)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        with profile_request(scope["method"], scope["path"], reason) as profile:
+
+            async def send_with_profile_id(message: Message):
+                if message["type"] == "http.response.start":
+                    profile.status_code = message["status"]
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-profile-id", profile.id.encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
+
+        logger.info(
+            "Profiled request",
+            profile_id=profile.id,
+            path=scope["path"],
+            reason=reason,
+            duration_ms=round(profile.duration * 1000, 3),
+        )
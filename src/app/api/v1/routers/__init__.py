@@ -1,4 +1,6 @@
 from .gsc_router import gsc_router
 from .checkpointer_router import checkpointer_router
+from .admin_router import admin_router
+from .attachments_router import attachments_router
 
-__all__ = ["gsc_router", "checkpointer_router"]
+__all__ = ["gsc_router", "checkpointer_router", "admin_router", "attachments_router"]
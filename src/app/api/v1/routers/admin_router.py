@@ -0,0 +1,80 @@
+import structlog
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.api.v1.dependencies import verify_admin_key
+from app.services.gsc.anomaly_job import run_anomaly_detection
+from app.utils.llm_gateway import llm_gateway
+from app.utils.profiling import profiler
+
+# Use structlog's get_logger (structlog is configured in main.py)
+logger = structlog.get_logger()
+
+admin_router = APIRouter(
+    prefix="/admin", tags=["admin"], dependencies=[Depends(verify_admin_key)]
+)
+
+
+@admin_router.get("/admission", summary="Admission control gauges")
+async def get_admission_stats(request: Request):
+    """Return the current in-flight and queued request counts."""
+    return request.app.state.admission_controller.stats()
+
+
+@admin_router.get("/llm", summary="LLM gateway gauges")
+async def get_llm_stats():
+    """Return the LLM gateway's in-use and waiting call counts."""
+    return {
+        "deployments": llm_gateway.deployments,
+        **llm_gateway.limiter.stats(),
+    }
+
+
+@admin_router.get("/profiles", summary="List recent request profiles")
+async def list_profiles():
+    """Return a summary of the most recent request profiles, newest first."""
+    return profiler.recent()
+
+
+@admin_router.get("/profiles/{profile_id}", summary="Get a request profile")
+async def get_profile(profile_id: str):
+    """Return the span breakdown of a request profile."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return profile.to_dict()
+
+
+@admin_router.get(
+    "/profiles/{profile_id}/collapsed",
+    summary="Get a request profile as collapsed stacks",
+    response_class=PlainTextResponse,
+)
+async def get_profile_collapsed(profile_id: str):
+    """
+    Return the sampled stacks of a request profile in collapsed-stack format.
+
+    The output can be loaded into speedscope or rendered with flamegraph.pl.
+    Only worker threads inside a span are sampled (sync endpoints, GSC calls,
+    sync graph nodes); work on the shared event loop appears in the span
+    timings only.
+    """
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return profile.collapsed()
+
+
+@admin_router.post(
+    "/anomalies/run",
+    summary="Run anomaly detection over all connected sites",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def run_anomalies(background_tasks: BackgroundTasks):
+    """Start the anomaly detection batch job in the background."""
+    background_tasks.add_task(run_anomaly_detection)
+    return {"status": "started"}
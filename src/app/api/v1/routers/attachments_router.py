@@ -0,0 +1,51 @@
+import structlog
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlmodel import Session
+
+from app.api.v1.dependencies import get_sqlmodel_session, verify_session_token
+from app.services.attachments.attachment_store import get_attachments, store_attachment
+
+# Use structlog's get_logger (structlog is configured in main.py)
+logger = structlog.get_logger()
+
+attachments_router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+
+class UploadAttachmentRequest(BaseModel):
+    content: str
+
+
+@attachments_router.post("", summary="Upload a data attachment")
+def upload_attachment(
+    body: UploadAttachmentRequest = Body(...),
+    session=Depends(verify_session_token),
+    db: Session = Depends(get_sqlmodel_session),
+):
+    """
+    Store pasted data (CSV, TSV, JSON records or plain text) once and return its ID.
+
+    Pass the returned ID in the agent state's `attachment_ids` instead of sending the
+    data itself on every run. Uploading the same content again returns the same ID.
+    """
+    if not body.content.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Attachment is empty"
+        )
+    attachment = store_attachment(body.content, session.user_id, db=db)
+    return {"attachment_id": attachment.id, "profile": attachment.profile}
+
+
+@attachments_router.get("/{attachment_id}", summary="Get a data attachment's profile")
+def get_attachment_profile(
+    attachment_id: str,
+    session=Depends(verify_session_token),
+    db: Session = Depends(get_sqlmodel_session),
+):
+    """Return the schema, row count and summary statistics of an attachment."""
+    attachments = get_attachments([attachment_id], session.user_id, db=db)
+    if not attachments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found"
+        )
+    return {"attachment_id": attachment_id, "profile": attachments[0].profile}
@@ -1,11 +1,20 @@
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlmodel import Session
 
 from app.api.v1.dependencies import get_sqlmodel_session, verify_session_token
+from app.services.gsc.anomaly_job import get_site_anomalies
 from app.services.gsc.gsc_initial import get_service
 from typing import Optional
-from app.services.gsc.search_analytics import get_search_analytics, list_sites
+from app.services.gsc.keyword_index import index_search_analytics_rows
+from app.services.gsc.search_analytics import (
+    get_search_analytics,
+    get_search_analytics_for_values,
+    list_sites,
+)
+from app.utils.profiling import span
 
 # Use structlog's get_logger (structlog is configured in main.py)
 logger = structlog.get_logger()
@@ -25,7 +34,8 @@ def get_user_sites(
     """
     user_id = session.user_id
     try:
-        service = get_service(user_id, db=db)
+        with span("get_service"):
+            service = get_service(user_id, db=db)
         sites = list_sites(service)
         logger.info("Fetched GSC sites", user_id=user_id, site_count=len(sites))
         return sites
@@ -44,6 +54,7 @@ def get_user_sites(
 )
 def search_analytics(
     site_url: str,
+    background_tasks: BackgroundTasks,
     row_limit: int = 25000,
     startDate: Optional[str] = None,
     endDate: Optional[str] = None,
@@ -52,6 +63,8 @@ def search_analytics(
     device_to_filter_by: Optional[str] = None,
     keyword_to_filter_by: Optional[str] = None,
     page_to_filter_by: Optional[str] = None,
+    keywords_to_filter_by: Optional[list[str]] = Query(None),
+    pages_to_filter_by: Optional[list[str]] = Query(None),
     session=Depends(verify_session_token),
     db: Session = Depends(get_sqlmodel_session),
 ):
@@ -61,16 +74,29 @@ def search_analytics(
     This endpoint fetches search analytics data such as queries, clicks, impressions, CTR, and position
     for the specified site and date range. You can customize the results by selecting one or more dimensions
     (e.g., "query", "page,country", etc.) and by applying optional filters.
+
+    `keywords_to_filter_by` or `pages_to_filter_by` (repeated parameters) keep rows matching any of
+    the given queries or pages, e.g. the results of the agent's keyword search, in as few Search
+    Console calls as possible. Only one of them can be used per request.
+
+    Query and page values in the result are added to the user's keyword index
+    of the site in the background.
     """
     user_id = session.user_id
+    if keywords_to_filter_by and pages_to_filter_by:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either keywords_to_filter_by or pages_to_filter_by, not both",
+        )
     try:
         if dimensions is None or dimensions.strip() == "":
             dimensions_list = ["date"]
         else:
             dimensions_list = [d.strip() for d in dimensions.split(",") if d.strip()]
 
-        service = get_service(user_id, db=db)
-        rows = get_search_analytics(
+        with span("get_service"):
+            service = get_service(user_id, db=db)
+        filters = dict(
             site_url=site_url,
             row_limit=row_limit,
             startDate=startDate,
@@ -82,6 +108,16 @@ def search_analytics(
             page_to_filter_by=page_to_filter_by,
             service=service,
         )
+        if keywords_to_filter_by:
+            rows = get_search_analytics_for_values(
+                filter_dimension="query", values=keywords_to_filter_by, **filters
+            )
+        elif pages_to_filter_by:
+            rows = get_search_analytics_for_values(
+                filter_dimension="page", values=pages_to_filter_by, **filters
+            )
+        else:
+            rows = get_search_analytics(**filters)
         logger.info(
             "Fetched search analytics",
             user_id=user_id,
@@ -93,9 +129,20 @@ def search_analytics(
                 "device": device_to_filter_by,
                 "keyword": keyword_to_filter_by,
                 "page": page_to_filter_by,
+                "keywords": len(keywords_to_filter_by or []),
+                "pages": len(pages_to_filter_by or []),
             },
         )
-        return rows
+        background_tasks.add_task(
+            _index_rows,
+            user_id=user_id,
+            site_url=site_url,
+            rows=rows,
+            dimensions=dimensions_list,
+        )
+        with span("serialization", row_count=len(rows)):
+            response = JSONResponse(jsonable_encoder(rows))
+        return response
     except Exception as e:
         logger.error(
             "Failed to fetch search analytics",
@@ -107,3 +154,33 @@ def search_analytics(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to fetch search analytics: {e}",
         )
+
+
+@gsc_router.get(
+    "/anomalies",
+    summary="Get detected anomalies for a GSC site",
+    response_model=list[dict],
+)
+def site_anomalies(
+    site_url: str,
+    limit: int = 100,
+    session=Depends(verify_session_token),
+    db: Session = Depends(get_sqlmodel_session),
+):
+    """
+    Return the anomalies found by the latest anomaly detection runs for a site.
+
+    Each anomaly reports the day, the series (whole site, a page or a query), the
+    observed and expected value of the metric, its z-score and its relative change.
+    """
+    anomalies = get_site_anomalies(session.user_id, site_url, db=db, limit=limit)
+    return [anomaly.model_dump(mode="json") for anomaly in anomalies]
+
+
+def _index_rows(user_id: str, site_url: str, rows: list[dict], dimensions: list[str]):
+    try:
+        index_search_analytics_rows(user_id, site_url, rows, dimensions)
+    except Exception as e:
+        logger.error(
+            "Failed to index keywords", user_id=user_id, site_url=site_url, error=str(e)
+        )
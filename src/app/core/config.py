@@ -11,8 +11,40 @@ class Settings(BaseSettings):
     chroma_tenant: str = ""
     chroma_database: str = ""
     chroma_api_key: str = ""
+    chroma_persist_directory: str = ".chroma"
+    # Top queries and pages per site indexed by the daily job
+    keyword_index_top_n: int = 5000
+    azure_embedding_deployment: str = "text-embedding-3-small"
+    azure_chat_deployment: str = "gpt-4.1"
+    # JSON list, e.g. '["gpt-4.1-eastus2"]'; tried in order when the primary fails
+    azure_fallback_deployments: list[str] = []
+    llm_max_concurrency: int = 4
+    llm_max_retries: int = 3
+    llm_max_retry_wait: float = 20.0
+    llm_bound_model_cache_size: int = 32
+    llm_http_max_connections: int = 20
+    llm_http_max_keepalive_connections: int = 10
     google_client_id: str = ""
     google_client_secret: str = ""
+    admin_api_key: str = ""
+    admission_global_limit: int = 8
+    admission_per_user_limit: int = 2
+    admission_queue_size: int = 32
+    admission_per_user_queue_size: int = 4
+    admission_queue_timeout: float = 10.0
+    admission_retry_after: int = 5
+    profiler_sample_rate: float = 0.0
+    profiler_max_profiles: int = 50
+    profiler_interval: float = 0.005
+    anomaly_lookback_days: int = 56
+    anomaly_baseline_window: int = 28
+    anomaly_evaluation_days: int = 1
+    anomaly_top_n: int = 50
+    anomaly_z_threshold: float = 3.0
+    anomaly_min_delta: float = 0.3
+    anomaly_min_baseline: float = 5.0
+    anomaly_fetch_concurrency: int = 4
+    anomaly_process_workers: int = 1
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", case_sensitive=False, extra="ignore"
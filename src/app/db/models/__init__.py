@@ -1,3 +1,5 @@
 from .auth_db_models import SessionModel, AccountModel, UserModel
+from .anomaly_db_models import AnomalyModel
+from .attachment_db_models import AttachmentModel
 
-__all__ = ["SessionModel", "AccountModel", "UserModel"]
+__all__ = ["SessionModel", "AccountModel", "UserModel", "AnomalyModel", "AttachmentModel"]
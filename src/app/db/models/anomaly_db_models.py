@@ -0,0 +1,23 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+class AnomalyModel(SQLModel, table=True):
+    __tablename__: str = "gsc_anomaly"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: str = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    site_url: str = Field(nullable=False, index=True)
+    # "site" for whole-site totals, otherwise the GSC dimension ("page", "query")
+    dimension: str = Field(nullable=False)
+    dimension_value: Optional[str] = Field(default=None)
+    metric: str = Field(nullable=False)
+    anomaly_date: date = Field(nullable=False, index=True)
+    value: float = Field(nullable=False)
+    expected: float = Field(nullable=False)
+    z_score: float = Field(nullable=False)
+    delta: float = Field(nullable=False)
+    detected_at: datetime = Field(default_factory=datetime.now, nullable=False)
@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any
+from sqlmodel import JSON, Column, Field, SQLModel
+
+
+class AttachmentModel(SQLModel, table=True):
+    __tablename__: str = "data_attachment"
+
+    # SHA-256 of the content; the same payload uploaded twice is stored once per user
+    id: str = Field(primary_key=True, nullable=False)
+    user_id: str = Field(
+        foreign_key="user.id", primary_key=True, nullable=False, ondelete="CASCADE"
+    )
+    format: str = Field(nullable=False)
+    size_bytes: int = Field(nullable=False)
+    content: str = Field(nullable=False)
+    profile: dict[str, Any] = Field(sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.now, nullable=False)
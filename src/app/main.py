@@ -5,7 +5,14 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from copilotkit import CopilotKitRemoteEndpoint, LangGraphAgent
-from app.api.v1.routers import gsc_router, checkpointer_router
+from app.api.v1.admission import AdmissionControlMiddleware, AdmissionController
+from app.api.v1.profiling import ProfilingMiddleware
+from app.api.v1.routers import (
+    gsc_router,
+    checkpointer_router,
+    admin_router,
+    attachments_router,
+)
 from app.core import settings
 from app.db.base import create_db_and_tables
 from app.services.workflows.main_workflow import main_graph_builder
@@ -54,6 +61,30 @@ app = FastAPI(
 
 app.include_router(gsc_router)
 app.include_router(checkpointer_router)
+app.include_router(admin_router)
+app.include_router(attachments_router)
+
+app.state.admission_controller = AdmissionController(
+    global_limit=settings.admission_global_limit,
+    per_user_limit=settings.admission_per_user_limit,
+    queue_size=settings.admission_queue_size,
+    per_user_queue_size=settings.admission_per_user_queue_size,
+    queue_timeout=settings.admission_queue_timeout,
+)
+
+app.add_middleware(
+    ProfilingMiddleware,
+    path_prefixes=("/copilotkit", "/gsc"),
+    sample_rate=settings.profiler_sample_rate,
+)
+
+# Added before CORS so rejections still carry CORS headers
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=app.state.admission_controller,
+    path_prefixes=("/copilotkit", "/gsc"),
+    retry_after=settings.admission_retry_after,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,343 @@
+import csv
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, NamedTuple, Optional
+
+import structlog
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
+from sqlmodel import Session, col, select
+
+from app.db.models import AttachmentModel
+
+logger = structlog.get_logger(__name__)
+
+SAMPLE_ROW_COUNT = 3
+TOP_VALUE_COUNT = 5
+MAX_QUERY_ROWS = 500
+# Profiles go into the prompt on every turn, so their size is bounded
+MAX_PROFILED_COLUMNS = 50
+MAX_PROFILE_VALUE_LENGTH = 100
+PARSED_TABLE_CACHE_SIZE = 32
+
+
+class ParsedTable(NamedTuple):
+    format: str
+    columns: list[str]
+    rows: list[list[Any]]
+
+
+def attachment_id(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _coerce(value: Any) -> Any:
+    """Convert numeric-looking strings to numbers and blank strings to None."""
+    if not isinstance(value, str):
+        return value
+    stripped = value.strip()
+    if not stripped:
+        return None
+    try:
+        return int(stripped)
+    except ValueError:
+        pass
+    try:
+        number = float(stripped)
+    except ValueError:
+        return value
+    return number if math.isfinite(number) else value
+
+
+def _parse_json(content: str) -> Optional[ParsedTable]:
+    try:
+        payload = json.loads(content)
+    except ValueError:
+        return None
+    if isinstance(payload, dict):
+        # {"rows": [...]} or any object wrapping a single list of records
+        lists = [value for value in payload.values() if isinstance(value, list)]
+        payload = lists[0] if len(lists) == 1 else [payload]
+    if not isinstance(payload, list):
+        return None
+    if not all(isinstance(r, dict) for r in payload):
+        # A list of scalars becomes a single "value" column
+        return ParsedTable(
+            "json",
+            ["value"],
+            [[json.dumps(v) if isinstance(v, (dict, list)) else v] for v in payload],
+        )
+
+    columns: dict[str, None] = {}
+    for record in payload:
+        columns.update(dict.fromkeys(record))
+    rows = [
+        [
+            json.dumps(v) if isinstance(v, (dict, list)) else v
+            for v in (record.get(column) for column in columns)
+        ]
+        for record in payload
+    ]
+    return ParsedTable("json", list(columns), rows)
+
+
+def _parse_delimited(content: str) -> Optional[ParsedTable]:
+    sample = content[:8192]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        has_header = csv.Sniffer().has_header(sample)
+    except csv.Error:
+        return None
+    records = [r for r in csv.reader(io.StringIO(content), dialect) if any(r)]
+    # A single line is a header without rows or plain text, never a table
+    if len(records) < 2:
+        return None
+
+    header = records[0] if has_header else []
+    width = max(len(r) for r in records)
+    columns = [
+        header[i].strip() if i < len(header) and header[i].strip() else f"column_{i + 1}"
+        for i in range(width)
+    ]
+    body = records[1:] if has_header else records
+    rows = [[_coerce(v) for v in r] + [None] * (width - len(r)) for r in body]
+    return ParsedTable("csv", columns, rows)
+
+
+def parse_attachment(content: str) -> ParsedTable:
+    """
+    Parse pasted data into a table.
+
+    JSON records or scalars and delimited text (CSV, TSV, ...) with at least
+    two lines are recognised; anything else becomes a single "line" column
+    with one row per non-empty line.
+    """
+    table = _parse_json(content) or _parse_delimited(content)
+    if table is not None:
+        return table
+    lines = [[line] for line in content.splitlines() if line.strip()]
+    return ParsedTable("text", ["line"], lines)
+
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_PROFILE_VALUE_LENGTH:
+        return value[:MAX_PROFILE_VALUE_LENGTH] + "..."
+    return value
+
+
+def _column_profile(name: str, values: list[Any]) -> dict[str, Any]:
+    present = [v for v in values if v is not None]
+    profile: dict[str, Any] = {"name": _truncate(name), "non_null": len(present)}
+    numbers = [
+        v for v in present if isinstance(v, (int, float)) and not isinstance(v, bool)
+    ]
+    if present and len(numbers) == len(present):
+        profile.update(
+            type="number",
+            min=min(numbers),
+            max=max(numbers),
+            mean=round(sum(numbers) / len(numbers), 4),
+            sum=round(sum(numbers), 4),
+        )
+    else:
+        counts = Counter(str(v) for v in present)
+        profile.update(
+            type="string",
+            distinct=len(counts),
+            top_values=[
+                _truncate(value) for value, _ in counts.most_common(TOP_VALUE_COUNT)
+            ],
+        )
+    return profile
+
+
+def profile_table(table: ParsedTable) -> dict[str, Any]:
+    """
+    Summarise a table: schema, row count and per-column statistics.
+
+    Only the first ``MAX_PROFILED_COLUMNS`` columns are profiled, and long
+    strings are truncated, so the profile stays small whatever the payload.
+    """
+    profiled = table.columns[:MAX_PROFILED_COLUMNS]
+    return {
+        "format": table.format,
+        "row_count": len(table.rows),
+        "column_count": len(table.columns),
+        "columns": [
+            _column_profile(name, [row[i] for row in table.rows])
+            for i, name in enumerate(profiled)
+        ],
+        "sample_rows": [
+            [_truncate(v) for v in row[: len(profiled)]]
+            for row in table.rows[:SAMPLE_ROW_COUNT]
+        ],
+    }
+
+
+_parsed_tables: OrderedDict[str, ParsedTable] = OrderedDict()
+_parsed_tables_lock = threading.Lock()
+
+
+def _cached_table(digest: str) -> Optional[ParsedTable]:
+    with _parsed_tables_lock:
+        if digest in _parsed_tables:
+            _parsed_tables.move_to_end(digest)
+            return _parsed_tables[digest]
+    return None
+
+
+def _parsed_table(digest: str, content: str) -> ParsedTable:
+    """Parse an attachment, caching the most recently used tables by digest."""
+    table = _cached_table(digest)
+    if table is not None:
+        return table
+    table = parse_attachment(content)
+    with _parsed_tables_lock:
+        _parsed_tables[digest] = table
+        if len(_parsed_tables) > PARSED_TABLE_CACHE_SIZE:
+            _parsed_tables.popitem(last=False)
+    return table
+
+
+def _get_stored(digest: str, user_id: str, db: Session) -> Optional[AttachmentModel]:
+    return db.get(
+        AttachmentModel, (digest, user_id), options=[defer(AttachmentModel.content)]
+    )
+
+
+def store_attachment(content: str, user_id: str, *, db: Session) -> AttachmentModel:
+    """
+    Store a payload and its profile, returning the existing row if already stored.
+
+    Attachments are content-addressed, so re-sending the same data is cheap.
+    """
+    digest = attachment_id(content)
+    existing = _get_stored(digest, user_id, db)
+    if existing:
+        return existing
+
+    table = _parsed_table(digest, content)
+    attachment = AttachmentModel(
+        id=digest,
+        user_id=user_id,
+        format=table.format,
+        size_bytes=len(content.encode()),
+        content=content,
+        profile=profile_table(table),
+    )
+    db.add(attachment)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Stored concurrently by another run or upload of the same data
+        db.rollback()
+        existing = _get_stored(digest, user_id, db)
+        if existing is None:
+            raise
+        return existing
+    db.refresh(attachment)
+    logger.info(
+        "Stored data attachment",
+        attachment_id=digest,
+        user_id=user_id,
+        format=table.format,
+        row_count=len(table.rows),
+    )
+    return attachment
+
+
+def get_attachments(
+    attachment_ids: list[str], user_id: str, *, db: Session
+) -> list[AttachmentModel]:
+    """
+    Return a user's attachments in the given order, skipping unknown IDs.
+
+    The raw content is not loaded: callers only need the profiles, and the
+    rows are read through ``get_attachment_table``.
+    """
+    stmt = (
+        select(AttachmentModel)
+        .options(defer(AttachmentModel.content))
+        .where(AttachmentModel.user_id == user_id)
+        .where(col(AttachmentModel.id).in_(attachment_ids))
+    )
+    attachments = {a.id: a for a in db.exec(stmt).all()}
+    return [attachments[i] for i in attachment_ids if i in attachments]
+
+
+def get_attachment_table(
+    digest: str, user_id: str, *, db: Session
+) -> Optional[ParsedTable]:
+    """
+    Return the parsed table of a user's attachment, or None if it does not exist.
+
+    The content is only loaded when the table is not cached yet.
+    """
+    owned = (AttachmentModel.id == digest) & (AttachmentModel.user_id == user_id)
+    table = _cached_table(digest)
+    if table is not None:
+        found = db.exec(select(AttachmentModel.id).where(owned)).first()
+        return table if found is not None else None
+    content = db.exec(select(AttachmentModel.content).where(owned)).first()
+    return _parsed_table(digest, content) if content is not None else None
+
+
+def query_attachment(
+    table: ParsedTable,
+    columns: Optional[list[str]] = None,
+    filter_column: Optional[str] = None,
+    filter_value: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 50,
+    offset: int = 0,
+) -> dict[str, Any]:
+    """
+    Select rows from a parsed attachment.
+
+    Filtering matches numbers exactly and strings by case-insensitive substring.
+    Raises ValueError on unknown column names.
+    """
+    index = {name: i for i, name in enumerate(table.columns)}
+    for name in [*(columns or []), filter_column, sort_by]:
+        if name is not None and name not in index:
+            raise ValueError(f"Unknown column {name!r}, available: {table.columns}")
+
+    rows = table.rows
+    if filter_column is not None and filter_value is not None:
+        i = index[filter_column]
+        target = _coerce(filter_value)
+        needle = str(filter_value).lower()
+        rows = [
+            row
+            for row in rows
+            if (
+                row[i] == target
+                if isinstance(row[i], (int, float))
+                else needle in str(row[i] or "").lower()
+            )
+        ]
+    if sort_by is not None:
+        i = index[sort_by]
+        present = [row for row in rows if row[i] is not None]
+        missing = [row for row in rows if row[i] is None]
+        try:
+            present.sort(key=lambda row: row[i], reverse=descending)
+        except TypeError:
+            present.sort(key=lambda row: str(row[i]), reverse=descending)
+        rows = present + missing
+
+    selected = [index[name] for name in columns] if columns else list(index.values())
+    limit = max(1, min(limit, MAX_QUERY_ROWS))
+    offset = max(0, offset)
+    page = rows[offset : offset + limit]
+    return {
+        "columns": [table.columns[i] for i in selected],
+        "rows": [[row[i] for i in selected] for row in page],
+        "total_matches": len(rows),
+        "offset": offset,
+    }
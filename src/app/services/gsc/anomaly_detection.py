@@ -0,0 +1,92 @@
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# This module only depends on NumPy so that process pool workers can import
+# it without loading the rest of the application.
+
+
+class DetectedAnomalies(NamedTuple):
+    series_index: np.ndarray
+    day_index: np.ndarray
+    value: np.ndarray
+    expected: np.ndarray
+    z_score: np.ndarray
+    delta: np.ndarray
+
+
+def detect_anomalies(
+    values: np.ndarray,
+    window: int = 28,
+    season: int = 7,
+    evaluation_days: int = 1,
+    z_threshold: float = 3.0,
+    min_delta: float = 0.3,
+    min_baseline: float = 5.0,
+) -> DetectedAnomalies:
+    """
+    Flag anomalous days in many daily series at once.
+
+    For every evaluated day, the baseline is the ``window`` preceding days of
+    the same series. The baseline is split into weeks of ``season`` days: the
+    expected value is the mean of the baseline days falling on the same
+    weekday, and the spread is the standard deviation of the baseline once
+    each day's weekday mean is removed. Weekly seasonality therefore neither
+    triggers alerts nor inflates the spread.
+
+    A day is flagged when ``|z_score| >= z_threshold``, the relative change
+    against the expected value is at least ``min_delta``, and the expected
+    value is at least ``min_baseline`` (to ignore near-empty series).
+
+    Parameters:
+        values (np.ndarray): Array of shape (n_series, n_days), oldest day first.
+        window (int): Number of baseline days, a multiple of ``season``.
+        season (int): Seasonality period in days.
+        evaluation_days (int): Number of most recent days to evaluate.
+
+    Returns:
+        DetectedAnomalies: Parallel arrays, one entry per flagged (series, day).
+    """
+    if window % season:
+        raise ValueError("window must be a multiple of season")
+
+    values = np.asarray(values, dtype=np.float64)
+    n_days = values.shape[1]
+    evaluation_days = min(evaluation_days, n_days - window)
+    if values.shape[0] == 0 or evaluation_days <= 0:
+        empty = np.empty(0)
+        return DetectedAnomalies(*(empty.astype(np.int64),) * 2, *(empty,) * 4)
+
+    # (n_series, n_days - window + 1, window) views; drop the last window, which
+    # ends on the final day and so has no day after it to evaluate
+    baselines = sliding_window_view(values, window, axis=1)[:, :-1]
+    baselines = baselines[:, -evaluation_days:]
+    observed = values[:, -evaluation_days:]
+
+    # (n_series, evaluation_days, weeks, season); since window is a whole
+    # number of weeks, the evaluated day has the same weekday as phase 0
+    weeks = baselines.reshape(*baselines.shape[:2], window // season, season)
+    weekday_means = weeks.mean(axis=2)
+    expected = weekday_means[..., 0]
+    residuals = weeks - weekday_means[:, :, np.newaxis, :]
+    spread = residuals.reshape(*baselines.shape).std(axis=-1, ddof=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = np.where(spread > 0, (observed - expected) / spread, 0.0)
+        delta = np.where(expected > 0, (observed - expected) / expected, 0.0)
+
+    flagged = (
+        (np.abs(z_score) >= z_threshold)
+        & (np.abs(delta) >= min_delta)
+        & (expected >= min_baseline)
+    )
+    series_index, offset = np.nonzero(flagged)
+    return DetectedAnomalies(
+        series_index=series_index,
+        day_index=offset + (n_days - evaluation_days),
+        value=observed[flagged],
+        expected=expected[flagged],
+        z_score=z_score[flagged],
+        delta=delta[flagged],
+    )
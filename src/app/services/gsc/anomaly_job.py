@@ -0,0 +1,344 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+import structlog
+from sqlalchemy import delete, func, tuple_
+from sqlmodel import Session, col, select
+
+from app.core import settings
+from app.db.base import engine
+from app.db.models import AccountModel, AnomalyModel
+from app.services.gsc.anomaly_detection import detect_anomalies
+from app.services.gsc.gsc_initial import get_service
+from app.services.gsc.keyword_index import index_search_analytics_rows
+from app.services.gsc.search_analytics import (
+    exact_match_patterns,
+    get_search_analytics,
+    list_sites,
+)
+
+logger = structlog.get_logger(__name__)
+
+METRICS = ("clicks", "impressions")
+ENTITY_DIMENSIONS = ("page", "query")
+# Search Console data for the last couple of days is still incomplete
+GSC_DATA_DELAY_DAYS = 3
+
+
+class SeriesKey(NamedTuple):
+    user_id: str
+    site_url: str
+    dimension: str
+    dimension_value: Optional[str]
+    metric: str
+
+
+def _to_matrix(
+    rows: list[dict], date_index: dict[str, int], top_n: Optional[int]
+) -> tuple[list[Optional[str]], dict[str, np.ndarray]]:
+    """
+    Turn ``["date"]`` or ``["date", <dimension>]`` rows into one daily series per key.
+
+    With ``top_n`` only the keys with the most clicks over the period are kept.
+    Missing days are filled with zeros.
+    """
+    totals: dict[Optional[str], float] = {}
+    for row in rows:
+        keys = row["keys"]
+        entity = keys[1] if len(keys) > 1 else None
+        totals[entity] = totals.get(entity, 0) + row["clicks"]
+    entities = sorted(totals, key=totals.get, reverse=True)[:top_n]
+    entity_index = {entity: i for i, entity in enumerate(entities)}
+
+    matrices = {
+        metric: np.zeros((len(entities), len(date_index))) for metric in METRICS
+    }
+    for row in rows:
+        keys = row["keys"]
+        entity = keys[1] if len(keys) > 1 else None
+        i = entity_index.get(entity)
+        j = date_index.get(keys[0])
+        if i is None or j is None:
+            continue
+        for metric in METRICS:
+            matrices[metric][i, j] = row[metric]
+    return entities, matrices
+
+
+def _index_keywords(user_id: str, site_url: str, rows: list[dict], dimension: str):
+    try:
+        index_search_analytics_rows(user_id, site_url, rows, [dimension])
+    except Exception as e:
+        logger.error(
+            "Failed to index keywords", user_id=user_id, site_url=site_url, error=str(e)
+        )
+
+
+def _fetch_top_entity_rows(
+    service,
+    user_id: str,
+    site_url: str,
+    start_date: str,
+    end_date: str,
+    dimension: str,
+    n_days: int,
+) -> list[dict]:
+    """
+    Fetch the daily rows of the ``anomaly_top_n`` entities of a dimension.
+
+    The top entities are fetched first, then only their daily rows, so large
+    sites do not pull every (date, entity) row of the period. The same top
+    list, up to ``keyword_index_top_n`` entries, refreshes the user's keyword
+    index of the site.
+    """
+    top_rows = get_search_analytics(
+        service,
+        site_url,
+        start_date,
+        end_date,
+        row_limit=max(settings.anomaly_top_n, settings.keyword_index_top_n),
+        dimensions=[dimension],
+    )
+    _index_keywords(user_id, site_url, top_rows, dimension)
+    entities = [row["keys"][0] for row in top_rows[: settings.anomaly_top_n]]
+
+    rows: list[dict] = []
+    for group, pattern in exact_match_patterns(entities):
+        rows.extend(
+            get_search_analytics(
+                service,
+                site_url,
+                start_date,
+                end_date,
+                row_limit=len(group) * n_days,
+                dimensions=["date", dimension],
+                extra_filters=[
+                    {
+                        "dimension": dimension,
+                        "operator": "includingRegex",
+                        "expression": pattern,
+                    }
+                ],
+            )
+        )
+    return rows
+
+
+def _fetch_account_series(
+    user_id: str, dates: list[date]
+) -> tuple[list[tuple[SeriesKey, np.ndarray]], list[str]]:
+    """
+    Fetch the daily series of every site of an account.
+
+    Returns the series and the sites whose series were all fetched; a site
+    failing part way contributes no series.
+
+    Runs in a worker thread; the Search Console client is not thread safe, so
+    each account builds its own service and fetches its sites sequentially.
+    """
+    with Session(engine) as db:
+        service = get_service(user_id, db=db)
+
+    start_date, end_date = dates[0].isoformat(), dates[-1].isoformat()
+    date_index = {d.isoformat(): i for i, d in enumerate(dates)}
+    series: list[tuple[SeriesKey, np.ndarray]] = []
+    site_urls: list[str] = []
+
+    for site in list_sites(service):
+        # get_search_analytics expects the bare domain of the property
+        site_url = site["siteUrl"].removeprefix("https://")
+        site_series: list[tuple[SeriesKey, np.ndarray]] = []
+        try:
+            for dimension in ("site", *ENTITY_DIMENSIONS):
+                if dimension == "site":
+                    rows = get_search_analytics(
+                        service,
+                        site_url,
+                        start_date,
+                        end_date,
+                        row_limit=len(dates),
+                        dimensions=["date"],
+                    )
+                else:
+                    rows = _fetch_top_entity_rows(
+                        service,
+                        user_id,
+                        site_url,
+                        start_date,
+                        end_date,
+                        dimension,
+                        len(dates),
+                    )
+                entities, matrices = _to_matrix(rows, date_index, settings.anomaly_top_n)
+                for metric, matrix in matrices.items():
+                    for entity, values in zip(entities, matrix):
+                        key = SeriesKey(user_id, site_url, dimension, entity, metric)
+                        site_series.append((key, values))
+        except Exception as e:
+            logger.error(
+                "Failed to fetch site series",
+                user_id=user_id,
+                site_url=site_url,
+                error=str(e),
+            )
+            continue
+        series.extend(site_series)
+        site_urls.append(site_url)
+    return series, site_urls
+
+
+def _save_anomalies(
+    anomalies: list[AnomalyModel],
+    analysed: set[tuple[str, str]],
+    evaluated: list[date],
+):
+    """
+    Replace the anomalies of the evaluated days for the analysed sites.
+
+    ``analysed`` holds (user_id, site_url) pairs. This keeps reruns idempotent
+    while leaving the previous results of sites whose fetch failed untouched.
+    """
+    with Session(engine) as db:
+        db.execute(
+            delete(AnomalyModel)
+            .where(
+                tuple_(col(AnomalyModel.user_id), col(AnomalyModel.site_url)).in_(
+                    list(analysed)
+                )
+            )
+            .where(col(AnomalyModel.anomaly_date).in_(evaluated))
+        )
+        db.add_all(anomalies)
+        db.commit()
+
+
+async def run_anomaly_detection(end_date: Optional[date] = None) -> int:
+    """
+    Detect anomalies in the daily series of every connected site.
+
+    Series are fetched with bounded concurrency, then stacked into a single
+    matrix and scored in a process pool, one chunk per worker. Returns the
+    number of anomalies stored.
+    """
+    end_date = end_date or date.today() - timedelta(days=GSC_DATA_DELAY_DAYS)
+    dates = [
+        end_date - timedelta(days=offset)
+        for offset in reversed(range(settings.anomaly_lookback_days))
+    ]
+
+    with Session(engine) as db:
+        user_ids = db.exec(
+            select(AccountModel.user_id)
+            .where(AccountModel.provider_id == "google")
+            .where(col(AccountModel.refresh_token).is_not(None))
+            .distinct()
+        ).all()
+
+    semaphore = asyncio.Semaphore(settings.anomaly_fetch_concurrency)
+
+    async def fetch(user_id: str):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(_fetch_account_series, user_id, dates)
+            except Exception as e:
+                logger.error(
+                    "Failed to fetch account series", user_id=user_id, error=str(e)
+                )
+                return [], []
+
+    results = await asyncio.gather(*(fetch(user_id) for user_id in user_ids))
+    series = [item for account_series, _ in results for item in account_series]
+    analysed = {
+        (user_id, site_url)
+        for user_id, (_, site_urls) in zip(user_ids, results)
+        for site_url in site_urls
+    }
+    evaluated = dates[-settings.anomaly_evaluation_days :]
+    if not series:
+        # Sites without data still drop the results of an earlier run
+        await asyncio.to_thread(_save_anomalies, [], analysed, evaluated)
+        logger.info("No series to analyse", account_count=len(user_ids))
+        return 0
+
+    keys = [key for key, _ in series]
+    values = np.vstack([values for _, values in series])
+    chunks = np.array_split(
+        np.arange(len(keys)), min(settings.anomaly_process_workers, len(keys))
+    )
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(
+        max_workers=settings.anomaly_process_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        detections = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool,
+                    detect_anomalies,
+                    values[chunk],
+                    settings.anomaly_baseline_window,
+                    7,
+                    settings.anomaly_evaluation_days,
+                    settings.anomaly_z_threshold,
+                    settings.anomaly_min_delta,
+                    settings.anomaly_min_baseline,
+                )
+                for chunk in chunks
+            )
+        )
+
+    anomalies = []
+    for chunk, detected in zip(chunks, detections):
+        for i, day, value, expected, z_score, delta in zip(*detected):
+            key = keys[chunk[i]]
+            anomalies.append(
+                AnomalyModel(
+                    user_id=key.user_id,
+                    site_url=key.site_url,
+                    dimension=key.dimension,
+                    dimension_value=key.dimension_value,
+                    metric=key.metric,
+                    anomaly_date=dates[day],
+                    value=float(value),
+                    expected=float(expected),
+                    z_score=float(z_score),
+                    delta=float(delta),
+                )
+            )
+
+    await asyncio.to_thread(_save_anomalies, anomalies, analysed, evaluated)
+    logger.info(
+        "Anomaly detection finished",
+        account_count=len(user_ids),
+        series_count=len(keys),
+        anomaly_count=len(anomalies),
+        end_date=end_date.isoformat(),
+    )
+    return len(anomalies)
+
+
+def get_site_anomalies(
+    user_id: str, site_url: str, *, db: Session, limit: int = 100
+) -> list[AnomalyModel]:
+    """Return the most recent anomalies of a site, largest deviations first."""
+    stmt = (
+        select(AnomalyModel)
+        .where(AnomalyModel.user_id == user_id)
+        .where(AnomalyModel.site_url == site_url)
+        .order_by(
+            col(AnomalyModel.anomaly_date).desc(),
+            func.abs(AnomalyModel.z_score).desc(),
+        )
+        .limit(limit)
+    )
+    return list(db.exec(stmt).all())
+
+
+if __name__ == "__main__":
+    count = asyncio.run(run_anomaly_detection())
+    print(f"Stored {count} anomalies")
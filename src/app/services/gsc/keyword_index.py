@@ -0,0 +1,147 @@
+import hashlib
+from functools import lru_cache
+from typing import Iterable, Literal
+
+import chromadb
+import structlog
+from langchain_chroma import Chroma
+
+from app.core import settings
+from app.utils.models_utils import embedding_model
+
+logger = structlog.get_logger(__name__)
+
+IndexedDimension = Literal["query", "page"]
+
+INDEXED_DIMENSIONS: tuple[IndexedDimension, ...] = ("query", "page")
+# Number of strings sent to the embedding deployment per request
+EMBEDDING_BATCH_SIZE = 500
+
+
+@lru_cache
+def _get_chroma_client():
+    """
+    Return the Chroma client used for keyword indexes.
+
+    Chroma Cloud is used when an API key is configured, otherwise the
+    collections live in a local persistent directory.
+    """
+    if settings.chroma_api_key:
+        return chromadb.CloudClient(
+            tenant=settings.chroma_tenant,
+            database=settings.chroma_database,
+            api_key=settings.chroma_api_key,
+        )
+    return chromadb.PersistentClient(path=settings.chroma_persist_directory)
+
+
+def _collection_name(user_id: str, site_url: str) -> str:
+    # Chroma collection names are limited to 63 [a-zA-Z0-9._-] characters
+    return f"gsc_{hashlib.sha1(f'{user_id}:{site_url}'.encode()).hexdigest()}"
+
+
+def _document_id(dimension: str, value: str) -> str:
+    return hashlib.sha1(f"{dimension}:{value}".encode()).hexdigest()
+
+
+@lru_cache(maxsize=128)
+def get_keyword_index(user_id: str, site_url: str) -> Chroma:
+    """
+    Return the vector store holding the query and page strings of a user's site.
+
+    Indexes are per user: they only hold rows the user's own Search Console
+    calls returned, so a user cannot read another account's keywords by
+    naming its site.
+    """
+    return Chroma(
+        collection_name=_collection_name(user_id, site_url),
+        embedding_function=embedding_model,
+        client=_get_chroma_client(),
+        collection_metadata={
+            "user_id": user_id,
+            "site_url": site_url,
+            "hnsw:space": "cosine",
+        },
+    )
+
+
+def extract_indexable_values(
+    rows: Iterable[dict], dimensions: list[str]
+) -> dict[str, set[str]]:
+    """
+    Collect the distinct query and page strings from search analytics rows.
+
+    Row keys are positional, so each value is matched to its dimension using
+    the dimensions list the rows were requested with.
+    """
+    positions = {
+        dimension: dimensions.index(dimension)
+        for dimension in INDEXED_DIMENSIONS
+        if dimension in dimensions
+    }
+    values: dict[str, set[str]] = {dimension: set() for dimension in positions}
+    for row in rows:
+        keys = row.get("keys", [])
+        for dimension, position in positions.items():
+            if position < len(keys) and keys[position]:
+                values[dimension].add(keys[position])
+    return values
+
+
+def index_search_analytics_rows(
+    user_id: str, site_url: str, rows: Iterable[dict], dimensions: list[str]
+) -> int:
+    """
+    Add the query and page strings found in ``rows`` to the user's site index.
+
+    Indexing is incremental: strings that are already in the collection are
+    skipped, so only new keywords are embedded. Returns the number of
+    strings added.
+    """
+    values = extract_indexable_values(rows, dimensions)
+    if not any(values.values()):
+        return 0
+
+    index = get_keyword_index(user_id, site_url)
+    added = 0
+    for dimension, dimension_values in values.items():
+        candidates = sorted(dimension_values)
+        for start in range(0, len(candidates), EMBEDDING_BATCH_SIZE):
+            batch = candidates[start : start + EMBEDDING_BATCH_SIZE]
+            ids = [_document_id(dimension, value) for value in batch]
+            existing = set(index.get(ids=ids, include=[])["ids"])
+            new = [
+                (doc_id, value)
+                for doc_id, value in zip(ids, batch)
+                if doc_id not in existing
+            ]
+            if not new:
+                continue
+            index.add_texts(
+                texts=[value for _, value in new],
+                metadatas=[{"dimension": dimension} for _ in new],
+                ids=[doc_id for doc_id, _ in new],
+            )
+            added += len(new)
+
+    logger.info(
+        "Indexed search analytics keywords",
+        user_id=user_id,
+        site_url=site_url,
+        dimensions=dimensions,
+        added=added,
+    )
+    return added
+
+
+def search_keyword_index(
+    user_id: str,
+    site_url: str,
+    text: str,
+    dimension: IndexedDimension = "query",
+    k: int = 200,
+) -> list[str]:
+    """Return the ``k`` indexed strings of ``dimension`` most similar to ``text``."""
+    index = get_keyword_index(user_id, site_url)
+    documents = index.similarity_search(text, k=k, filter={"dimension": dimension})
+    return [document.page_content for document in documents]
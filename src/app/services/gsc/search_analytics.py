@@ -4,11 +4,17 @@ from sqlmodel import Session
 
 from app.db.base import engine
 from app.services.gsc.gsc_initial import get_service
+from app.utils.profiling import span
 
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
+# Search Console rejects regex filters longer than 4096 characters
+MAX_REGEX_LENGTH = 4000
+_RE2_SPECIAL_CHARACTERS = set("\\.^$|?*+()[]{}")
+
+
 class SearchAnalyticsRow(BaseModel):
     keys: list[str] = Field(
         ...,
@@ -47,6 +53,7 @@ def get_search_analytics(
     device_to_filter_by: Optional[str] = None,
     keyword_to_filter_by: Optional[str] = None,
     page_to_filter_by: Optional[str] = None,
+    extra_filters: Optional[list[dict]] = None,
 ) -> List[SearchAnalyticsRow]:
     """
     Fetch Google Search Console analytics data for a given site and date range.
@@ -61,6 +68,8 @@ def get_search_analytics(
         device_to_filter_by (str, optional): Filter results by device ("MOBILE", "DESKTOP", "TABLET").
         keyword_to_filter_by (str, optional): Filter results by keyword/query.
         page_to_filter_by (str, optional): Filter results by page URL.
+        extra_filters (list[dict], optional): Additional raw GSC dimension filters
+            (e.g., {"dimension": "page", "operator": "includingRegex", "expression": "..."}).
 
     Returns:
         List[SearchAnalyticsRow]: List of analytics rows, each with keys: 'clicks', 'ctr', 'impressions', 'keys', 'position'.
@@ -98,15 +107,18 @@ def get_search_analytics(
             filters.append({"dimension": "query", "expression": keyword_to_filter_by})
         if page_to_filter_by:
             filters.append({"dimension": "page", "expression": page_to_filter_by})
+        if extra_filters:
+            filters.extend(extra_filters)
 
         if filters:
             request["dimensionFilterGroups"] = [{"filters": filters}]
 
-        response = (
-            service.searchanalytics()
-            .query(siteUrl=f"sc-domain:{site_url}", body=request)
-            .execute()
-        )
+        with span("gsc_page", start_row=start_row, row_limit=batch_limit):
+            response = (
+                service.searchanalytics()
+                .query(siteUrl=f"sc-domain:{site_url}", body=request)
+                .execute()
+            )
 
         rows = response.get("rows", [])
         all_rows.extend(rows)
@@ -126,6 +138,95 @@ def get_search_analytics(
     return all_rows
 
 
+def _regex_escape(value: str) -> str:
+    # re.escape also escapes characters such as spaces, which RE2 rejects
+    return "".join(f"\\{c}" if c in _RE2_SPECIAL_CHARACTERS else c for c in value)
+
+
+def exact_match_patterns(values: list[str]) -> list[tuple[list[str], str]]:
+    """Group values into anchored alternation regexes within the length limit."""
+    patterns: list[tuple[list[str], str]] = []
+    group: list[str] = []
+    escaped: list[str] = []
+    for value in values:
+        candidate = _regex_escape(value)
+        if escaped and len("|".join([*escaped, candidate])) + 6 > MAX_REGEX_LENGTH:
+            patterns.append((group, f"^(?:{'|'.join(escaped)})$"))
+            group, escaped = [], []
+        group.append(value)
+        escaped.append(candidate)
+    if group:
+        patterns.append((group, f"^(?:{'|'.join(escaped)})$"))
+    return patterns
+
+
+def _merge_rows(rows: list[dict]) -> list[dict]:
+    """Sum rows sharing the same keys; position is averaged over impressions."""
+    merged: dict[tuple, dict] = {}
+    for row in rows:
+        key = tuple(row["keys"])
+        total = merged.setdefault(
+            key, {"keys": row["keys"], "clicks": 0, "impressions": 0, "position": 0.0}
+        )
+        total["clicks"] += row["clicks"]
+        total["impressions"] += row["impressions"]
+        total["position"] += row["position"] * row["impressions"]
+    for total in merged.values():
+        impressions = total["impressions"]
+        total["ctr"] = total["clicks"] / impressions if impressions else 0.0
+        total["position"] = total["position"] / impressions if impressions else 0.0
+    return list(merged.values())
+
+
+def get_search_analytics_for_values(
+    service,
+    site_url: str,
+    startDate: str,
+    endDate: str,
+    filter_dimension: str,
+    values: list[str],
+    row_limit: int = 25000,
+    dimensions: list[str] = ["date"],
+    **filters,
+) -> List[SearchAnalyticsRow]:
+    """
+    Fetch analytics data restricted to any of ``values`` of ``filter_dimension``.
+
+    Values are matched exactly with an "includingRegex" filter. Lists too long
+    for one regex are split over several requests; their rows are merged by
+    keys when ``filter_dimension`` is not one of the ``dimensions``.
+
+    Parameters:
+        filter_dimension (str): "query" or "page".
+        values (list[str]): Queries or page URLs to keep.
+        filters: Other arguments of ``get_search_analytics``.
+    """
+    rows = []
+    for _, pattern in exact_match_patterns(values):
+        rows.extend(
+            get_search_analytics(
+                service,
+                site_url,
+                startDate,
+                endDate,
+                row_limit=row_limit,
+                dimensions=dimensions,
+                extra_filters=[
+                    {
+                        "dimension": filter_dimension,
+                        "operator": "includingRegex",
+                        "expression": pattern,
+                    }
+                ],
+                **filters,
+            )
+        )
+    if filter_dimension not in dimensions:
+        rows = _merge_rows(rows)
+    rows.sort(key=lambda row: row["clicks"], reverse=True)
+    return rows[:row_limit] if row_limit else rows
+
+
 if __name__ == "__main__":
     with Session(engine) as session:
         service = get_service("gAf7wNMxd93mxhCHqZRZIVXtgcbwNHNz", db=session)
@@ -4,7 +4,9 @@ from copilotkit import CopilotKitState
 class InputState(CopilotKitState):
     user_id: str
     site_url: str
+    # Raw pasted data; moved to the attachment store on the next run
     data: str | None = None
+    attachment_ids: list[str] | None = None
 
 
 class OutputState(CopilotKitState):
@@ -1,9 +1,30 @@
+import asyncio
+from typing import Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.message import StateGraph
 from langgraph.graph.state import START, END
+from langgraph.prebuilt import ToolNode
+from sqlmodel import Session
+from app.db.base import engine
+from app.db.models import AttachmentModel
+from app.services.attachments.attachment_store import get_attachments, store_attachment
 from app.services.workflows.main_state import OverallState, InputState, OutputState
 
+from app.services.workflows.prompts.attachments_prompt import get_attachments_prompt
 from app.services.workflows.prompts.gsc_prompt import get_gsc_prompt
-from app.utils.models_utils import gpt41_model
+from app.services.workflows.tools.anomaly_tools import get_detected_anomalies
+from app.services.workflows.tools.attachment_tools import query_attachment_rows
+from app.services.workflows.tools.keyword_index_tools import search_site_keywords
+from app.utils.llm_gateway import Priority, ToolSet, llm_gateway
+from app.utils.profiling import span
+
+# Tools executed by the backend; every other tool call is a CopilotKit
+# frontend action and ends the run so the frontend can handle it.
+backend_tools = [search_site_keywords, get_detected_anomalies, query_attachment_rows]
+backend_tool_names = {t.name for t in backend_tools}
+backend_tool_set = ToolSet(backend_tools)
 
 
 # def search_analytics_node(state: OverallState):
@@ -27,34 +48,113 @@ from app.utils.models_utils import gpt41_model
 #     return {"messages": result["messages"]}
 
 
-def search_analytics_node(state: OverallState):
+def _load_attachments(
+    data: Optional[str], attachment_ids: list[str], user_id: str
+) -> list[AttachmentModel]:
+    with Session(engine) as session:
+        # Raw data is stored once and replaced by its ID, so it is neither
+        # re-sent to the model nor re-serialized into every checkpoint
+        if data:
+            attachment = store_attachment(data, user_id, db=session)
+            if attachment.id not in attachment_ids:
+                attachment_ids.append(attachment.id)
+        return get_attachments(attachment_ids, user_id, db=session)
+
+
+async def search_analytics_node(state: OverallState, config: RunnableConfig):
     actions = state.get("copilotkit", {}).get("actions", [])
-    model = gpt41_model.bind_tools(actions)
 
     systemt_prompt = get_gsc_prompt()
+    user_id = state.get("user_id")
     data = state.get("data", None)
-    if data:
-        response = model.invoke(
-            [systemt_prompt, *state["messages"], {"role": "user", "content": data}]
+    attachment_ids = list(state.get("attachment_ids") or [])
+    update = {}
+    attachments = []
+
+    if data or attachment_ids:
+        attachments = await asyncio.to_thread(
+            _load_attachments, data, attachment_ids, user_id
+        )
+        if data:
+            update = {"data": None, "attachment_ids": attachment_ids}
+
+    prompt = [systemt_prompt]
+    if attachments:
+        prompt.append(get_attachments_prompt(attachments))
+
+    # Finishing turns already in their tool loop goes before starting new ones
+    priority = (
+        Priority.CONTINUATION
+        if isinstance(state["messages"][-1], ToolMessage)
+        else Priority.NEW_TURN
+    )
+    with span("llm_call", message_count=len(state["messages"])):
+        response = await llm_gateway.ainvoke(
+            [*prompt, *state["messages"]],
+            actions=actions,
+            tool_set=backend_tool_set,
+            priority=priority,
+            config=config,
         )
-    else:
-        response = model.invoke([systemt_prompt, *state["messages"]])
-    return {"messages": [response]}
+    return {"messages": [_drop_mixed_backend_calls(response)], **update}
+
+
+def _drop_mixed_backend_calls(response: AIMessage) -> AIMessage:
+    """
+    Keep only the frontend actions of a message that also calls backend tools.
+
+    Such a message ends the run so the frontend can execute its actions; the
+    backend calls would otherwise stay unanswered in the history. The model
+    can issue them again on the next turn.
+    """
+    tool_calls = response.tool_calls
+    frontend_calls = [tc for tc in tool_calls if tc["name"] not in backend_tool_names]
+    if not frontend_calls or len(frontend_calls) == len(tool_calls):
+        return response
+    kept_ids = {tc["id"] for tc in frontend_calls}
+    additional_kwargs = dict(response.additional_kwargs)
+    if "tool_calls" in additional_kwargs:
+        additional_kwargs["tool_calls"] = [
+            tc for tc in additional_kwargs["tool_calls"] if tc.get("id") in kept_ids
+        ]
+    return response.model_copy(
+        update={"tool_calls": frontend_calls, "additional_kwargs": additional_kwargs}
+    )
+
+
+def route_after_search_analytics(state: OverallState) -> str:
+    last_message = state["messages"][-1]
+    if (
+        isinstance(last_message, AIMessage)
+        and last_message.tool_calls
+        and all(
+            tool_call["name"] in backend_tool_names
+            for tool_call in last_message.tool_calls
+        )
+    ):
+        return "tool_node"
+    return END
 
 
 main_graph_builder = StateGraph(OverallState, input=InputState, output=OutputState)
 
 main_graph_builder.add_node(search_analytics_node)
+main_graph_builder.add_node("tool_node", ToolNode(backend_tools))
 
 main_graph_builder.add_edge(START, "search_analytics_node")
-main_graph_builder.add_edge("search_analytics_node", END)
+main_graph_builder.add_conditional_edges(
+    "search_analytics_node", route_after_search_analytics, ["tool_node", END]
+)
+main_graph_builder.add_edge("tool_node", "search_analytics_node")
 main_graph = main_graph_builder.compile()
 if __name__ == "__main__":
-    result = main_graph.invoke(
-        {
-            "site_url": "knz-ma3lomati.blogspot.com",
-            "user_id": "gAf7wNMxd93mxhCHqZRZIVXtgcbwNHNz",
-            "messages": [{"role": "user", "content": "Hi"}],
-        }
+    result = asyncio.run(
+        main_graph.ainvoke(
+            {
+                "site_url": "knz-ma3lomati.blogspot.com",
+                "user_id": "gAf7wNMxd93mxhCHqZRZIVXtgcbwNHNz",
+                "messages": [{"role": "user", "content": "Hi"}],
+            }
+        )
     )
     print(result)
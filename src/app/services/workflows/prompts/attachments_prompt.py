@@ -0,0 +1,28 @@
+import json
+from langchain_core.messages import SystemMessage
+
+from app.db.models import AttachmentModel
+
+
+def get_attachments_prompt(attachments: list[AttachmentModel]) -> SystemMessage:
+    """
+    Returns a SystemMessage describing the data attached by the user.
+
+    Only the profile of each attachment is included; rows are fetched with the
+    query_attachment_rows tool.
+    """
+    profiles = "\n".join(
+        f"- attachment_id: {attachment.id}\n  profile: {json.dumps(attachment.profile, default=str)}"
+        for attachment in attachments
+    )
+    prompt = f"""
+        The user attached the following data. Only a profile of each attachment is shown:
+        its schema, row count, per-column statistics and a few sample rows. Long values are
+        truncated, and only the first columns of wide tables are profiled.
+        {profiles}
+        Tools:
+        query_attachment_rows: Use this tool to read rows of an attachment. Select only the columns,
+        filters, sorting and number of rows you need to answer. It returns full values.
+        """
+
+    return SystemMessage(prompt)
@@ -16,6 +16,14 @@ def get_gsc_prompt() -> SystemMessage:
         It only supports the 'date' dimension by default and does not support queries or other dimensions.
         If the user asks you about other dimensions than 'date', inform them that this functionality is not available at the moment. 
         Advise them to contact support by sending feedback.
+        search_site_keywords: Use this tool to find the site's search queries or page URLs related to a topic
+        (e.g., "pricing"). It searches the site's top queries and pages, refreshed daily. Prefer it over
+        listing every keyword. When get_gsc_analytics_data accepts keywords_to_filter_by or
+        pages_to_filter_by, pass the whole list of results there in a single call.
+        get_detected_anomalies: Use this tool when the user asks what changed recently. It returns the drops and
+        spikes already detected for the site and its top pages and queries.
+        Never call get_gsc_analytics_data in the same message as any other tool: wait for the
+        other tools' results first, then call it in a later message.
         """
 
     return SystemMessage(prompt)
@@ -0,0 +1,54 @@
+from typing import Annotated
+
+import structlog
+from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
+from sqlmodel import Session
+
+from app.db.base import engine
+from app.services.gsc.anomaly_job import get_site_anomalies
+
+logger = structlog.get_logger(__name__)
+
+
+@tool
+def get_detected_anomalies(
+    state: Annotated[dict, InjectedState], limit: int = 50
+) -> list[dict]:
+    """
+    Retrieve the anomalies recently detected for the site, largest deviations first.
+
+    Use this when the user asks what changed, dropped or spiked recently. Anomalies are
+    computed daily for the whole site and its top pages and queries.
+
+    Args:
+        limit (int): Maximum number of anomalies to return.
+    Returns:
+        list: An array of dictionaries with keys: 'anomaly_date', 'dimension' ("site",
+              "page" or "query"), 'dimension_value', 'metric', 'value', 'expected',
+              'z_score' and 'delta' (relative change, e.g. -0.4 for a 40% drop).
+    """
+    user_id = state.get("user_id")
+    site_url = state.get("site_url")
+    try:
+        with Session(engine) as db:
+            anomalies = get_site_anomalies(user_id, site_url, db=db, limit=limit)
+        return [
+            anomaly.model_dump(
+                mode="json",
+                include={
+                    "anomaly_date",
+                    "dimension",
+                    "dimension_value",
+                    "metric",
+                    "value",
+                    "expected",
+                    "z_score",
+                    "delta",
+                },
+            )
+            for anomaly in anomalies
+        ]
+    except Exception as e:
+        logger.error("Failed to fetch anomalies", site_url=site_url, error=str(e))
+        return []
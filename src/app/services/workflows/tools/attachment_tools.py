@@ -0,0 +1,63 @@
+from typing import Annotated, Optional
+
+import structlog
+from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
+from sqlmodel import Session
+
+from app.db.base import engine
+from app.services.attachments.attachment_store import (
+    get_attachment_table,
+    query_attachment,
+)
+
+logger = structlog.get_logger(__name__)
+
+
+@tool
+def query_attachment_rows(
+    attachment_id: str,
+    state: Annotated[dict, InjectedState],
+    columns: Optional[list[str]] = None,
+    filter_column: Optional[str] = None,
+    filter_value: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+    limit: int = 50,
+    offset: int = 0,
+) -> dict:
+    """
+    Read rows from data the user attached to the conversation.
+
+    Args:
+        attachment_id (str): ID of the attachment, as listed in the attachment profiles.
+        columns (list[str], optional): Columns to return. All columns if omitted.
+        filter_column (str, optional): Column to filter on.
+        filter_value (str, optional): Keep rows whose filter_column equals this number,
+            or contains this text (case-insensitive).
+        sort_by (str, optional): Column to sort by.
+        descending (bool): Sort order, largest first by default.
+        limit (int): Maximum number of rows to return, maximum value is 500.
+        offset (int): Number of matching rows to skip, for paging.
+    Returns:
+        dict: With keys 'columns', 'rows' (a list of row values in column order),
+              'total_matches' and 'offset'.
+    """
+    user_id = state.get("user_id")
+    with Session(engine) as db:
+        table = get_attachment_table(attachment_id, user_id, db=db)
+    if table is None:
+        return {"error": f"Attachment {attachment_id} not found"}
+    try:
+        return query_attachment(
+            table,
+            columns=columns,
+            filter_column=filter_column,
+            filter_value=filter_value,
+            sort_by=sort_by,
+            descending=descending,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
@@ -0,0 +1,48 @@
+from typing import Annotated, Literal
+
+import structlog
+from langchain_core.tools import tool
+from langgraph.prebuilt import InjectedState
+
+from app.services.gsc.keyword_index import search_keyword_index
+
+logger = structlog.get_logger(__name__)
+
+MAX_KEYWORD_RESULTS = 500
+
+
+@tool
+def search_site_keywords(
+    text: str,
+    state: Annotated[dict, InjectedState],
+    dimension: Literal["query", "page"] = "query",
+    k: int = 200,
+) -> list[str]:
+    """
+    Find the site's search queries or page URLs that are semantically related to a topic.
+
+    The index holds the site's top queries and pages, refreshed by the daily job, plus any
+    query or page returned by earlier analytics requests. Use this before filtering Google
+    Search Console data by keyword or page, instead of fetching the full keyword list. Pass
+    the returned strings as the keywords_to_filter_by or pages_to_filter_by list filter.
+
+    Args:
+        text (str): Topic to search for (e.g., "pricing", "shipping costs").
+        dimension (str): "query" to search search queries, "page" to search page URLs.
+        k (int): Maximum number of results to return, maximum value is 500.
+    Returns:
+        list: The matching queries or page URLs, most similar first.
+    """
+    user_id = state.get("user_id")
+    site_url = state.get("site_url")
+    k = max(1, min(k, MAX_KEYWORD_RESULTS))
+    try:
+        return search_keyword_index(user_id, site_url, text, dimension=dimension, k=k)
+    except Exception as e:
+        logger.error(
+            "Failed to search keyword index",
+            user_id=user_id,
+            site_url=site_url,
+            error=str(e),
+        )
+        return []
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Callable, Optional, Sequence
+
+import openai
+import structlog
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.core import settings
+from app.utils.models_utils import build_chat_model
+
+logger = structlog.get_logger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class Priority(IntEnum):
+    # Follow-up calls of a turn already running backend tools
+    CONTINUATION = 0
+    # First call of a new user turn
+    NEW_TURN = 1
+
+
+class PriorityLimiter:
+    """
+    Asyncio concurrency limiter with priority lanes.
+
+    Waiters are admitted lowest priority value first, FIFO within a lane.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._condition = asyncio.Condition()
+        self._in_use = 0
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        entry = (int(priority), next(self._sequence))
+        async with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                await self._condition.wait_for(
+                    lambda: self._in_use < self.limit and self._waiters[0] == entry
+                )
+            except BaseException:
+                # Cancelled while queued: let the next waiter move up
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiters)
+            self._in_use += 1
+            # The next waiter may fit in a remaining slot
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_use -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        return {"in_use": self._in_use, "waiting": len(self._waiters)}
+
+
+def _retry_after(error: openai.APIStatusError) -> Optional[float]:
+    """Return the delay requested by a rate-limited response, in seconds."""
+    headers = error.response.headers
+    if retry_after_ms := headers.get("retry-after-ms"):
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    if retry_after := headers.get("retry-after"):
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    return min(2**attempt, 8) + random.uniform(0, 0.5)
+
+
+def _default_model_factory(deployment: str) -> BaseChatModel:
+    # Retries are handled by the gateway
+    return build_chat_model(deployment, max_retries=0)
+
+
+def tools_hash(tools: Sequence[Any]) -> str:
+    schemas = [convert_to_openai_tool(tool) for tool in tools]
+    return hashlib.sha256(
+        json.dumps(schemas, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ToolSet:
+    """Static tools bound on every call; their schema hash is computed once."""
+
+    def __init__(self, tools: Sequence[Any]):
+        self.tools = list(tools)
+        self.key = tools_hash(self.tools)
+
+
+class LLMGateway:
+    """
+    Single entry point between the workflows and Azure OpenAI.
+
+    - Chat models share the keep-alive HTTP pools from ``models_utils``.
+    - Tool-bound models are cached per deployment, static tool set and the
+      raw frontend action dicts, so a cache hit converts no tool schema.
+    - A global limiter caps concurrent calls; follow-up calls of running
+      turns are admitted before the first call of new turns.
+    - Rate-limited calls are retried after the ``retry-after`` delay; when the
+      delay is too long or retries run out, the next deployment is tried.
+    """
+
+    def __init__(
+        self,
+        deployments: Sequence[str],
+        model_factory: Callable[[str], BaseChatModel] = _default_model_factory,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        max_retry_wait: float = 20.0,
+        cache_size: int = 32,
+    ):
+        if not deployments:
+            raise ValueError("At least one deployment is required")
+        self.deployments = list(deployments)
+        self.model_factory = model_factory
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.cache_size = cache_size
+        self.limiter = PriorityLimiter(max_concurrency)
+
+        self._models: dict[str, BaseChatModel] = {}
+        self._bound_models: OrderedDict[tuple[str, str, str], Runnable] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _model(self, deployment: str) -> BaseChatModel:
+        with self._lock:
+            if deployment not in self._models:
+                self._models[deployment] = self.model_factory(deployment)
+            return self._models[deployment]
+
+    def bound_model(
+        self,
+        deployment: str,
+        actions: Sequence[dict] = (),
+        tool_set: Optional[ToolSet] = None,
+    ) -> Runnable:
+        model = self._model(deployment)
+        static_tools = tool_set.tools if tool_set else []
+        if not actions and not static_tools:
+            return model
+        key = (
+            deployment,
+            tool_set.key if tool_set else "",
+            json.dumps(actions, sort_keys=True, default=str),
+        )
+        with self._lock:
+            if key in self._bound_models:
+                self._bound_models.move_to_end(key)
+                return self._bound_models[key]
+        bound = model.bind_tools([*actions, *static_tools])
+        with self._lock:
+            self._bound_models[key] = bound
+            if len(self._bound_models) > self.cache_size:
+                self._bound_models.popitem(last=False)
+        return bound
+
+    async def ainvoke(
+        self,
+        messages: Sequence[Any],
+        actions: Sequence[dict] = (),
+        tool_set: Optional[ToolSet] = None,
+        priority: Priority = Priority.NEW_TURN,
+        config: Optional[RunnableConfig] = None,
+    ) -> BaseMessage:
+        """
+        Call the first available deployment.
+
+        Pass the caller's ``config`` so the model call reports to the graph's
+        callbacks (token streaming, tracing); on Python 3.10 it is not
+        inherited from the running graph.
+        """
+        last_error: Optional[Exception] = None
+        for deployment in self.deployments:
+            model = self.bound_model(deployment, actions, tool_set)
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self.limiter.slot(priority):
+                        return await model.ainvoke(messages, config=config)
+                except openai.RateLimitError as e:
+                    last_error = e
+                    wait = _retry_after(e)
+                    wait = _backoff(attempt) if wait is None else wait
+                except RETRYABLE_ERRORS as e:
+                    last_error = e
+                    wait = _backoff(attempt)
+
+                if attempt == self.max_retries or wait > self.max_retry_wait:
+                    logger.warning(
+                        "LLM deployment unavailable, falling back",
+                        deployment=deployment,
+                        attempt=attempt,
+                        wait=wait,
+                        error=str(last_error),
+                    )
+                    break
+                logger.info(
+                    "Retrying LLM call",
+                    deployment=deployment,
+                    attempt=attempt,
+                    wait=wait,
+                    error=str(last_error),
+                )
+                await asyncio.sleep(wait)
+        raise last_error
+
+
+llm_gateway = LLMGateway(
+    deployments=[settings.azure_chat_deployment, *settings.azure_fallback_deployments],
+    max_concurrency=settings.llm_max_concurrency,
+    max_retries=settings.llm_max_retries,
+    max_retry_wait=settings.llm_max_retry_wait,
+    cache_size=settings.llm_bound_model_cache_size,
+)
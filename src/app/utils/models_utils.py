@@ -1,17 +1,43 @@
+import httpx
 from app.core import settings
-from langchain_openai import AzureChatOpenAI
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from pydantic import SecretStr
 
-gpt41_model = AzureChatOpenAI(
+# Keep-alive connection pools shared by every Azure OpenAI client
+_http_limits = httpx.Limits(
+    max_connections=settings.llm_http_max_connections,
+    max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+)
+_http_timeout = httpx.Timeout(120.0, connect=10.0)
+http_client = httpx.Client(limits=_http_limits, timeout=_http_timeout)
+http_async_client = httpx.AsyncClient(limits=_http_limits, timeout=_http_timeout)
+
+
+def build_chat_model(deployment: str, max_retries: int = 2) -> AzureChatOpenAI:
+    return AzureChatOpenAI(
+        api_key=SecretStr(settings.azure_api_key),
+        azure_endpoint=settings.azure_endpoint,
+        api_version="2025-01-01-preview",
+        azure_deployment=deployment,
+        name=deployment,
+        temperature=0.1,
+        max_retries=max_retries,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+embedding_model = AzureOpenAIEmbeddings(
     api_key=SecretStr(settings.azure_api_key),
     azure_endpoint=settings.azure_endpoint,
-    api_version="2025-01-01-preview",
-    azure_deployment="gpt-4.1",
-    name="gpt-4.1",
-    temperature=0.1,
+    api_version="2024-10-21",
+    azure_deployment=settings.azure_embedding_deployment,
+    http_client=http_client,
+    http_async_client=http_async_client,
 )
 
 if __name__ == "__main__":
     # Simple test to check if the model works
-    response = gpt41_model.invoke("Say hello in one sentence.")
+    model = build_chat_model(settings.azure_chat_deployment)
+    response = model.invoke("Say hello in one sentence.")
     print("Model response:", response)
@@ -0,0 +1,230 @@
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core import settings
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "current_profile", default=None
+)
+
+# Leaf frames of threads parked waiting for work; their samples are dropped
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+}
+
+
+def _format_stack(frame) -> Optional[str]:
+    code = frame.f_code
+    if (code.co_filename.rsplit("/", 1)[-1], code.co_name) in _IDLE_FRAMES:
+        return None
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class RequestProfile:
+    """
+    Sampled stacks and timed spans collected for a single request.
+
+    Only worker threads are sampled, and only while inside a ``span``. The
+    event-loop thread is shared by every concurrent request, so its stacks
+    are never attributed to a single one.
+    """
+
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.started_at = datetime.now(timezone.utc)
+        self.duration: Optional[float] = None
+        self.status_code: Optional[int] = None
+        self.spans: list[dict] = []
+        self.stacks: Counter[str] = Counter()
+        self.sample_count = 0
+
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._threads: Counter[int] = Counter()
+
+    def enter_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] += 1
+
+    def exit_thread(self, ident: int):
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def threads(self) -> list[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def record_sample(self, stack: str):
+        with self._lock:
+            self.stacks[stack] += 1
+            self.sample_count += 1
+
+    def add_span(self, name: str, start: float, end: float, attributes: dict):
+        with self._lock:
+            self.spans.append(
+                {
+                    "name": name,
+                    "offset_ms": round((start - self._start) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                    "thread": threading.current_thread().name,
+                    **({"attributes": attributes} if attributes else {}),
+                }
+            )
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": (
+                round(self.duration * 1000, 3) if self.duration is not None else None
+            ),
+            "status_code": self.status_code,
+            "sample_count": self.sample_count,
+        }
+
+    def to_dict(self) -> dict:
+        totals: dict[str, dict] = {}
+        for span_ in self.spans:
+            total = totals.setdefault(span_["name"], {"count": 0, "duration_ms": 0.0})
+            total["count"] += 1
+            total["duration_ms"] = round(total["duration_ms"] + span_["duration_ms"], 3)
+        return {**self.summary(), "span_totals": totals, "spans": self.spans}
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed-stack format (flamegraph.pl, speedscope)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+
+class Profiler:
+    """
+    Keeps the profiles of in-flight requests and the last ``max_profiles`` finished ones.
+
+    A single daemon thread samples the stacks of all profiled requests while
+    at least one profile is active, and exits when none is.
+    """
+
+    def __init__(self, max_profiles: int, interval: float):
+        self.interval = interval
+        self._active: dict[str, RequestProfile] = {}
+        self._finished: deque[RequestProfile] = deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self, method: str, path: str, reason: str) -> RequestProfile:
+        profile = RequestProfile(method, path, reason)
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(
+                    target=self._sample, name="request-profiler", daemon=True
+                )
+                self._sampler.start()
+        return profile
+
+    def stop(self, profile: RequestProfile):
+        profile.finish()
+        with self._lock:
+            self._active.pop(profile.id, None)
+            self._finished.append(profile)
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+                if not active:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for profile in active:
+                for ident in profile.threads():
+                    frame = frames.get(ident)
+                    stack = _format_stack(frame) if frame is not None else None
+                    if stack:
+                        profile.record_sample(stack)
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._finished)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            for profile in self._finished:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+
+profiler = Profiler(
+    max_profiles=settings.profiler_max_profiles,
+    interval=settings.profiler_interval,
+)
+
+
+@contextmanager
+def profile_request(method: str, path: str, reason: str):
+    profile = profiler.start(method, path, reason)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profiler.stop(profile)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block of work and sample its thread, if the request is being profiled.
+
+    Spans entered on the event loop are timed but not sampled. This is a
+    no-op outside a profiled request.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    ident = None if _on_event_loop() else threading.get_ident()
+    if ident is not None:
+        profile.enter_thread(ident)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, start, time.perf_counter(), attributes)
+        if ident is not None:
+            profile.exit_thread(ident)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
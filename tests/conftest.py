@@ -0,0 +1,4 @@
+import os
+
+# Settings are read at import time; tests never reach a real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
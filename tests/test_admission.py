@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from app.api.v1.admission import (
+    AdmissionControlMiddleware,
+    AdmissionController,
+    AdmissionRejected,
+)
+
+
+def _controller(**limits) -> AdmissionController:
+    options = dict(
+        global_limit=1,
+        per_user_limit=1,
+        queue_size=2,
+        per_user_queue_size=2,
+        queue_timeout=1.0,
+    )
+    options.update(limits)
+    return AdmissionController(**options)
+
+
+async def _queue(controller: AdmissionController, user_key: str) -> asyncio.Task:
+    task = asyncio.create_task(controller.acquire(user_key))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_rejects_when_queue_is_full():
+    async def scenario():
+        controller = _controller(queue_size=1)
+        await controller.acquire("a")
+        waiter = await _queue(controller, "b")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c")
+        assert (rejected.value.status_code, rejected.value.reason) == (503, "queue_full")
+        waiter.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_rejects_when_user_queue_is_full():
+    async def scenario():
+        controller = _controller(global_limit=2, per_user_queue_size=1)
+        await controller.acquire("a")
+        waiter = await _queue(controller, "a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("a")
+        assert (rejected.value.status_code, rejected.value.reason) == (
+            429,
+            "user_queue_full",
+        )
+        waiter.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_timeout_on_global_limit_is_service_unavailable():
+    async def scenario():
+        controller = _controller(global_limit=2, queue_timeout=0.01)
+        await controller.acquire("b")
+        await controller.acquire("c")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("a")
+        assert (rejected.value.status_code, rejected.value.reason) == (503, "timeout")
+        assert controller.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_timeout_on_own_user_limit_is_too_many_requests():
+    async def scenario():
+        controller = _controller(global_limit=2, queue_timeout=0.01)
+        await controller.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("a")
+        assert (rejected.value.status_code, rejected.value.reason) == (
+            429,
+            "user_timeout",
+        )
+        assert controller.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_release_admits_waiters_in_arrival_order():
+    async def scenario():
+        controller = _controller(per_user_limit=2, queue_size=3)
+        await controller.acquire("a")
+        first = await _queue(controller, "b")
+        second = await _queue(controller, "c")
+
+        # A newcomer running between the release and the woken waiter must
+        # queue behind the waiter instead of taking the freed slot
+        release = asyncio.create_task(controller.release("a"))
+        newcomer = asyncio.create_task(controller.acquire("d"))
+        await release
+        await asyncio.wait_for(first, 1)
+        assert not second.done() and not newcomer.done()
+
+        await controller.release("b")
+        await asyncio.wait_for(second, 1)
+        assert not newcomer.done()
+        await controller.release("c")
+        await asyncio.wait_for(newcomer, 1)
+        await controller.release("d")
+        assert controller.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_held_by_its_user_limit_does_not_block_others():
+    async def scenario():
+        controller = _controller(global_limit=3, per_user_limit=1)
+        await controller.acquire("a")
+        blocked = await _queue(controller, "a")
+        await asyncio.wait_for(controller.acquire("b"), 1)
+        assert not blocked.done()
+
+        await controller.release("a")
+        await asyncio.wait_for(blocked, 1)
+
+    asyncio.run(scenario())
+
+
+def test_middleware_releases_once_after_the_last_body_chunk():
+    async def scenario():
+        controller = _controller()
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"a", "more_body": True})
+            assert controller.stats()["in_flight"] == 1
+            await send({"type": "http.response.body", "body": b"b"})
+            # Background work after the response no longer holds the slot
+            assert controller.stats()["in_flight"] == 0
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = AdmissionControlMiddleware(
+            app, controller, path_prefixes=("/gsc",), retry_after=5
+        )
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/gsc/sites",
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+        }
+        await middleware(scope, None, send)
+        assert len(sent) == 3
+        assert controller.stats()["in_flight"] == 0
+        assert controller.stats()["active_users"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.services.gsc.anomaly_detection import detect_anomalies
+
+WEEKLY_PATTERN = np.array([100, 120, 110, 105, 90, 40, 35], dtype=float)
+
+
+def _seasonal_series(n_days: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.resize(WEEKLY_PATTERN, n_days) + rng.normal(0, 2, n_days)
+
+
+def test_flags_injected_drop_on_its_day():
+    values = np.vstack([_seasonal_series(42, seed) for seed in range(3)])
+    values[1, 40] = WEEKLY_PATTERN[40 % 7] * 0.3
+
+    detected = detect_anomalies(values, window=28, evaluation_days=7)
+
+    assert detected.series_index.tolist() == [1]
+    assert detected.day_index.tolist() == [40]
+    assert detected.value[0] == values[1, 40]
+    # The expected value follows the weekday, not the weekly average
+    assert detected.expected[0] == pytest.approx(WEEKLY_PATTERN[40 % 7], abs=3)
+    assert detected.z_score[0] < -3
+    assert detected.delta[0] == pytest.approx(-0.7, abs=0.05)
+
+
+def test_weekly_seasonality_is_not_flagged():
+    values = np.vstack([np.resize(WEEKLY_PATTERN, 56), _seasonal_series(56)])
+
+    detected = detect_anomalies(values, window=28, evaluation_days=28)
+
+    assert detected.series_index.size == 0
+
+
+@pytest.mark.parametrize("level", [0.0, 50.0])
+def test_flat_series_is_not_flagged(level):
+    detected = detect_anomalies(np.full((2, 35), level), evaluation_days=7)
+
+    assert detected.series_index.size == 0
+
+
+@pytest.mark.parametrize("n_days", [10, 28])
+def test_too_short_series_returns_empty_results(n_days):
+    detected = detect_anomalies(np.ones((3, n_days)), window=28)
+
+    assert all(array.size == 0 for array in detected)
+    assert detected.series_index.dtype == np.int64
+
+
+def test_window_must_be_a_multiple_of_season():
+    with pytest.raises(ValueError):
+        detect_anomalies(np.ones((1, 40)), window=20, season=7)
@@ -0,0 +1,122 @@
+import json
+from collections import OrderedDict
+
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.services.attachments import attachment_store
+from app.services.attachments.attachment_store import (
+    ParsedTable,
+    get_attachment_table,
+    get_attachments,
+    parse_attachment,
+    profile_table,
+    store_attachment,
+)
+
+
+def test_parses_csv_with_header():
+    table = parse_attachment("query,clicks\nrunning shoes,12\nboots,3\n")
+    assert table == ParsedTable(
+        "csv", ["query", "clicks"], [["running shoes", 12], ["boots", 3]]
+    )
+
+
+def test_parses_json_records():
+    table = parse_attachment('{"rows": [{"page": "/a", "clicks": 1}, {"page": "/b"}]}')
+    assert table == ParsedTable("json", ["page", "clicks"], [["/a", 1], ["/b", None]])
+
+
+def test_parses_json_scalars_as_value_column():
+    assert parse_attachment("[1,2,3]") == ParsedTable(
+        "json", ["value"], [[1], [2], [3]]
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["just one line of text, with comma", "a,b"],
+)
+def test_single_line_falls_back_to_text(content):
+    assert parse_attachment(content) == ParsedTable("text", ["line"], [[content]])
+
+
+def test_prose_falls_back_to_text():
+    table = parse_attachment("Traffic dropped on Monday.\n\nIt recovered on Friday.")
+    assert table.format == "text"
+    assert table.rows == [["Traffic dropped on Monday."], ["It recovered on Friday."]]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        # One row holding two large JSON-dumped lists
+        json.dumps({"a": list(range(10_000)), "b": ["x" * 20] * 2_000}),
+        # A single long line
+        "word " * 20_000,
+    ],
+)
+def test_profile_size_is_bounded(content):
+    profile = profile_table(parse_attachment(content))
+    assert len(json.dumps(profile)) < 20_000
+
+
+def test_profile_caps_columns():
+    header = ",".join(f"column {i}" for i in range(100))
+    row = ",".join(["some value"] * 100)
+    profile = profile_table(parse_attachment("\n".join([header, row, row])))
+    assert profile["format"] == "csv"
+    assert profile["column_count"] == 100
+    assert len(profile["columns"]) == 50
+    assert all(len(row) == 50 for row in profile["sample_rows"])
+
+
+def test_profile_truncates_long_values():
+    profile = profile_table(parse_attachment("x" * 1_000))
+    [column] = profile["columns"]
+    assert column["top_values"] == ["x" * 100 + "..."]
+    assert profile["sample_rows"] == [["x" * 100 + "..."]]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_profiles_and_tables_are_loaded_without_content(db, monkeypatch):
+    attachment = store_attachment("x,y\n1,2\n3,4\n", "user", db=db)
+    db.expunge_all()
+    monkeypatch.setattr(attachment_store, "_parsed_tables", OrderedDict())
+
+    [loaded] = get_attachments([attachment.id], "user", db=db)
+    assert loaded.profile["row_count"] == 2
+    assert "content" in inspect(loaded).unloaded
+
+    table = get_attachment_table(attachment.id, "user", db=db)
+    assert table == ParsedTable("csv", ["x", "y"], [[1, 2], [3, 4]])
+    assert get_attachment_table(attachment.id, "user", db=db) is table
+    assert get_attachment_table(attachment.id, "someone-else", db=db) is None
+
+
+def test_concurrent_store_returns_existing_row(db, monkeypatch):
+    content = "x,y\n1,2\n3,4\n"
+    stored = store_attachment(content, "user", db=db)
+    db.expunge_all()
+
+    # Another run stored the same data between the lookup and the insert
+    get_stored = attachment_store._get_stored
+    lookups = []
+
+    def racing_get_stored(*args):
+        lookups.append(args)
+        return get_stored(*args) if len(lookups) > 1 else None
+
+    monkeypatch.setattr(attachment_store, "_get_stored", racing_get_stored)
+    attachment = store_attachment(content, "user", db=db)
+    assert len(lookups) == 2
+    assert attachment.id == stored.id
+    assert attachment.profile == stored.profile
@@ -0,0 +1,82 @@
+import re
+
+from app.services.gsc.search_analytics import (
+    MAX_REGEX_LENGTH,
+    exact_match_patterns,
+    get_search_analytics_for_values,
+)
+
+
+class FakeSearchConsole:
+    """Search Console client answering from fixed (keys, clicks, impressions, position) rows."""
+
+    def __init__(self, rows: list[tuple[list[str], int, int, float]]):
+        self.rows = rows
+        self.requests: list[dict] = []
+
+    def searchanalytics(self):
+        return self
+
+    def query(self, siteUrl: str, body: dict):
+        self.requests.append(body)
+        return self
+
+    def execute(self):
+        body = self.requests[-1]
+        [group] = body.get("dimensionFilterGroups", [{"filters": []}])
+        patterns = [re.compile(f["expression"]) for f in group["filters"]]
+        rows = [
+            {
+                "keys": [date, query][: len(body["dimensions"])],
+                "clicks": clicks,
+                "impressions": impressions,
+                "ctr": clicks / impressions,
+                "position": position,
+            }
+            for (date, query), clicks, impressions, position in self.rows
+            if all(p.fullmatch(query) for p in patterns)
+        ]
+        return {"rows": rows[: body["rowLimit"]]}
+
+
+def test_exact_match_patterns_escape_and_split():
+    values = [f"keyword {i} (c++)" for i in range(500)]
+    patterns = exact_match_patterns(values)
+    assert len(patterns) > 1
+    assert [v for group, _ in patterns for v in group] == values
+    for group, pattern in patterns:
+        assert len(pattern) <= MAX_REGEX_LENGTH
+        assert all(re.fullmatch(pattern, v) for v in group)
+        assert not re.fullmatch(pattern, "keyword 1 (c+)")
+
+
+def test_values_across_requests_are_merged_by_keys(monkeypatch):
+    monkeypatch.setattr(
+        "app.services.gsc.search_analytics.MAX_REGEX_LENGTH", len("^(?:shoes)$")
+    )
+    service = FakeSearchConsole(
+        [
+            (["2025-01-01", "shoes"], 3, 10, 2.0),
+            (["2025-01-01", "boots"], 1, 30, 6.0),
+            (["2025-01-01", "hats"], 5, 5, 1.0),
+        ]
+    )
+    rows = get_search_analytics_for_values(
+        service,
+        "example.com",
+        "2025-01-01",
+        "2025-01-01",
+        filter_dimension="query",
+        values=["shoes", "boots"],
+        dimensions=["date"],
+    )
+    assert len(service.requests) == 2
+    assert rows == [
+        {
+            "keys": ["2025-01-01"],
+            "clicks": 4,
+            "impressions": 40,
+            "ctr": 0.1,
+            "position": 5.0,
+        }
+    ]